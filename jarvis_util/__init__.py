@@ -28,6 +28,7 @@ from jarvis_util.shell.local_exec import *
 from jarvis_util.shell.process import *
 from jarvis_util.shell.exec import *
 from jarvis_util.shell.ssh_exec import *
+from jarvis_util.shell.ssh_pool import *
 from jarvis_util.shell.pscp import *
 from jarvis_util.introspect.monitor import *
 from jarvis_util.introspect.system_info import *
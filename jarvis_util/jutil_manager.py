@@ -28,4 +28,5 @@ class JutilManager:
         self.debug_scp = False
         self.debug_slurm = False
         self.debug_pbs = True
+        self.ssh_control_master = True
 
@@ -8,6 +8,16 @@ from .pssh_exec import SshExec
 from .mpi_exec import MpiVersion, MpichExec, OpenMpiExec, CrayMpichExec
 from .exec_info import ExecInfo, ExecType, Executable
 
+_EXEC_TYPES = {
+    ExecType.LOCAL: LocalExec,
+    ExecType.SSH: SshExec,
+    ExecType.PSSH: PsshExec,
+    ExecType.MPICH: MpichExec,
+    ExecType.INTEL_MPI: MpichExec,
+    ExecType.OPENMPI: OpenMpiExec,
+    ExecType.CRAY_MPICH: CrayMpichExec,
+}
+
 
 class Exec(Executable):
     """
@@ -19,30 +29,21 @@ class Exec(Executable):
         """
         Execute a command or list of commands
 
-        :param cmd: list of commands or a single command string
+        :param cmd: list of commands or a single command string. PSSH
+        also accepts a dict mapping each host to its command(s).
         :param exec_info: Info needed to execute processes locally
         """
         super().__init__()
         if exec_info is None:
             exec_info = ExecInfo()
         exec_type = exec_info.exec_type
-        if exec_type == ExecType.LOCAL:
-            self.exec_ = LocalExec(cmd, exec_info)
-        elif exec_type == ExecType.SSH:
-            self.exec_ = SshExec(cmd, exec_info)
-        elif exec_type == ExecType.PSSH:
-            self.exec_ = PsshExec(cmd, exec_info)
-        elif exec_type == ExecType.MPI:
-            exec_type = MpiVersion(exec_info).version
-
-        if exec_type == ExecType.MPICH:
-            self.exec_ = MpichExec(cmd, exec_info)
-        elif exec_type == ExecType.INTEL_MPI:
-            self.exec_ = MpichExec(cmd, exec_info)
-        elif exec_type == ExecType.OPENMPI:
-            self.exec_ = OpenMpiExec(cmd, exec_info)
-        elif exec_type == ExecType.CRAY_MPICH:
-            self.exec_ = CrayMpichExec(cmd, exec_info)
+        if isinstance(cmd, dict) and exec_type != ExecType.PSSH:
+            raise Exception(f'{exec_type} does not support per-host commands')
+        if exec_type == ExecType.MPI:
+            exec_type = MpiVersion.get(exec_info)
+        if exec_type not in _EXEC_TYPES:
+            raise Exception(f'Exec does not support {exec_type}')
+        self.exec_ = _EXEC_TYPES[exec_type](cmd, exec_info)
 
         self.set_exit_code()
         self.set_output()
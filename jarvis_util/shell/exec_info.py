@@ -8,8 +8,86 @@ from enum import Enum
 from jarvis_util.util.hostfile import Hostfile
 from jarvis_util.jutil_manager import JutilManager
 import os
+import shutil
+import functools
 from abc import ABC, abstractmethod
 
+_BASIC_ENV_KEYS = ('PATH', 'LD_LIBRARY_PATH', 'LIBRARY_PATH',
+                   'CMAKE_PREFIX_PATH', 'PYTHON_PATH', 'CPATH', 'INCLUDE',
+                   'JAVA_HOME')
+
+
+@functools.lru_cache(maxsize=None)
+def find_binary(name, path=None):
+    """
+    Resolve the location of a binary. Results are cached per PATH, so
+    this is only a hint: a binary installed or removed later may be
+    reported stale until find_binary.cache_clear() is called. Commands
+    are still started through PATH, so a stale hint does not change
+    which binary runs.
+
+    :param name: The name of the binary
+    :param path: The PATH to search. Defaults to the PATH of this process.
+    :return: The path to the binary or None
+    """
+    return shutil.which(name, path=path)
+
+
+def _sudo_prefix(sudo, sudoenv, env):
+    """
+    Build the prefix placed before each command by smash_cmd.
+
+    :param sudo: Whether or not root is required
+    :param sudoenv: Whether sudo supports environment forwarding
+    :param env: The environment to forward to the command
+    :return: The prefix string, or None if commands run unmodified
+    """
+    if not sudo:
+        return None
+    if not sudoenv:
+        return 'sudo'
+    return 'sudo ' + ' '.join(f'-E {key}=\"{val}\"' for key, val
+                              in env.items())
+
+
+@functools.lru_cache(maxsize=64)
+def _load_hostfile(path, unused_mtime):
+    """
+    Parse a hostfile. Cached by path and modification time, so the file
+    is parsed again if it changes.
+
+    :param path: The absolute path to the hostfile
+    :param unused_mtime: The modification time of the hostfile
+    :return: Hostfile
+    """
+    return Hostfile(hostfile=path)
+
+
+@functools.lru_cache(maxsize=64)
+def _load_hosts(hosts):
+    """
+    Create a hostfile from a set of host names. Cached so that host IPs
+    are only resolved once.
+
+    :param hosts: A tuple of host names
+    :return: Hostfile
+    """
+    return Hostfile(all_hosts=list(hosts))
+
+
+class _ExecInfoKeys(tuple):
+    """
+    The names of the ExecInfo parameters. A tuple, so it can be shared by
+    every instance, which may still be extended with a list (e.g.,
+    self.keys += ['my_option']) as subclasses of ExecInfo used to do.
+    """
+
+    def __add__(self, other):
+        return _ExecInfoKeys(tuple(self) + tuple(other))
+
+    def __radd__(self, other):
+        return _ExecInfoKeys(tuple(other) + tuple(self))
+
 
 class ExecType(Enum):
     """
@@ -34,6 +112,14 @@ class ExecInfo:
     parameters such as the path to key-pairs, the hosts to run the program
     on, number of processes, etc.
     """
+
+    keys = _ExecInfoKeys((
+        'exec_type', 'nprocs', 'ppn', 'user', 'pkey', 'port',
+        'hostfile', 'env', 'sleep_ms', 'sudo', 'sudoenv',
+        'cwd', 'hosts', 'collect_output',
+        'pipe_stdout', 'pipe_stderr', 'hide_output',
+        'exec_async', 'stdin', 'do_dbg', 'dbg_port'))
+
     def __init__(self,  exec_type=ExecType.LOCAL, nprocs=None, ppn=None,
                  user=None, pkey=None, port=None,
                  hostfile=None, hosts=None, env=None,
@@ -89,46 +175,71 @@ class ExecInfo:
         self.stdin = stdin
         self.do_dbg = do_dbg
         self.dbg_port = dbg_port
-        self.keys = ['exec_type', 'nprocs', 'ppn', 'user', 'pkey', 'port',
-                     'hostfile', 'env', 'sleep_ms', 'sudo', 'sudoenv',
-                     'cwd', 'hosts', 'collect_output',
-                     'pipe_stdout', 'pipe_stderr', 'hide_output',
-                     'exec_async', 'stdin', 'do_dbg', 'dbg_port']
+
+    @property
+    def sudo(self):
+        return self._sudo
+
+    @sudo.setter
+    def sudo(self, sudo):
+        self._sudo = sudo
+        self._cmd_prefix = None
+
+    @property
+    def sudoenv(self):
+        return self._sudoenv
+
+    @sudoenv.setter
+    def sudoenv(self, sudoenv):
+        self._sudoenv = sudoenv
+        self._cmd_prefix = None
+
+    @property
+    def cmd_prefix(self):
+        """
+        The prefix placed before each command (e.g., sudo). Computed on
+        first use and kept until sudo, sudoenv or env change.
+
+        :return: The prefix string, or None if commands run unmodified
+        """
+        if self._cmd_prefix is None:
+            self._cmd_prefix = (_sudo_prefix(self.sudo, self.sudoenv,
+                                             self.basic_env),)
+        return self._cmd_prefix[0]
 
     def _set_env(self, env):
         if env is None:
             self.env = {}
         else:
             self.env = env
-        basic_env = [
-            'PATH', 'LD_LIBRARY_PATH', 'LIBRARY_PATH', 'CMAKE_PREFIX_PATH',
-            'PYTHON_PATH', 'CPATH', 'INCLUDE', 'JAVA_HOME'
-        ]
-        self.basic_env = {}
-        for key in basic_env:
-            if key not in os.environ:
-                continue
-            self.basic_env[key] = os.getenv(key)
-        for key, val in self.basic_env.items():
+        basic_env = [(key, os.environ[key]) for key in _BASIC_ENV_KEYS
+                     if key in os.environ]
+        for key, val in basic_env:
             if key not in self.env:
                 self.env[key] = val
+        self.basic_env = dict(basic_env)
         self.basic_env.update(self.env)
-        if 'LD_PRELOAD' in self.basic_env:
-            del self.basic_env['LD_PRELOAD']
+        self.basic_env.pop('LD_PRELOAD', None)
+        self._cmd_prefix = None
 
     def _set_hostfile(self, hostfile=None, hosts=None):
         if hostfile is not None:
             if isinstance(hostfile, str):
-                self.hostfile = Hostfile(hostfile=hostfile)
+                path = os.path.abspath(hostfile)
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    mtime = None
+                self.hostfile = _load_hostfile(path, mtime).copy()
             elif isinstance(hostfile, Hostfile):
                 self.hostfile = hostfile
             else:
                 raise Exception('Hostfile is neither string nor Hostfile')
         if hosts is not None:
             if isinstance(hosts, list):
-                self.hostfile = Hostfile(all_hosts=hosts)
+                self.hostfile = _load_hosts(tuple(hosts)).copy()
             elif isinstance(hosts, str):
-                self.hostfile = Hostfile(all_hosts=[hosts])
+                self.hostfile = _load_hosts((hosts,)).copy()
             elif isinstance(hosts, Hostfile):
                 self.hostfile = hosts
             else:
@@ -141,16 +252,33 @@ class ExecInfo:
             self.hostfile = Hostfile()
 
     def mod(self, **kwargs):
-        self._mod_kwargs(kwargs)
-        return ExecInfo(**kwargs)
+        """
+        Copy this ExecInfo, replacing the parameters in kwargs. The
+        environment and hostfile are only recomputed if they are modified.
 
-    def _mod_kwargs(self, kwargs):
-        for key in self.keys:
-            if key not in kwargs and hasattr(self, key):
-                kwargs[key] = getattr(self, key)
+        :param kwargs: The ExecInfo parameters to replace
+        :return: ExecInfo
+        """
+        # pylint: disable=W0212
+        new = self.copy()
+        for key, val in kwargs.items():
+            if key in self.keys and key not in ['env', 'hostfile', 'hosts']:
+                setattr(new, key, val)
+        if 'env' in kwargs:
+            new._set_env(kwargs['env'])
+        if 'hostfile' in kwargs or 'hosts' in kwargs:
+            new.hostfile = kwargs.get('hostfile', self.hostfile)
+            new._set_hostfile(hostfile=new.hostfile,
+                              hosts=kwargs.get('hosts'))
+        # pylint: enable=W0212
+        return new
 
     def copy(self):
-        return self.mod()
+        new = self.__class__.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+        new.env = self.env.copy()
+        new.basic_env = self.basic_env.copy()
+        return new
 
 
 class Executable(ABC):
@@ -188,19 +316,22 @@ class Executable(ABC):
         :param sudoenv: Whether sudo supports environment forwarding
         :return:
         """
-        env = None
-        if sudo:
-            env = ''
-            if sudoenv:
-                env = [f'-E {key}=\"{val}\"' for key, val in
-                       basic_env.items()]
-                env = ' '.join(env)
-            env = f'sudo {env}'
+        return self.prefix_cmd(cmds, _sudo_prefix(sudo, sudoenv, basic_env))
+
+    def prefix_cmd(self, cmds, prefix):
+        """
+        Convert a list of commands into a single command for the shell
+        to execute, placing a precomputed prefix before each command.
+
+        :param cmds: A list of commands or a single command string
+        :param prefix: The prefix for each command (e.g., ExecInfo.cmd_prefix)
+        :return:
+        """
         if not isinstance(cmds, (list, tuple)):
             cmds = [cmds]
-        if env is not None:
-            cmds = [f'{env} {cmd}' for cmd in cmds]
-        return ';'.join(cmds)
+        if prefix is None:
+            return ';'.join(cmds)
+        return ';'.join(f'{prefix} {cmd}' for cmd in cmds)
 
     def wait_list(self, nodes):
         for node in nodes:
@@ -214,8 +345,8 @@ class Executable(ABC):
         :param nodes:
         :return:
         """
-        self.stdout = '\n'.join([node.stdout for node in nodes])
-        self.stderr = '\n'.join([node.stderr for node in nodes])
+        self.stdout = '\n'.join(node.stdout for node in nodes)
+        self.stderr = '\n'.join(node.stderr for node in nodes)
 
     def per_host_outputs(self, nodes):
         """
@@ -225,19 +356,24 @@ class Executable(ABC):
         :param nodes:
         :return:
         """
-        self.stdout = {}
-        self.stderr = {}
         self.stdout = {node.addr: node.stdout for node in nodes}
         self.stderr = {node.addr: node.stderr for node in nodes}
 
     def set_exit_code_list(self, nodes):
         """
-        Set the exit code from a set of nodes.
+        Set the exit code from a set of nodes. This is 0 if all nodes
+        succeeded, otherwise the last non-zero exit code. It is None
+        while any node is still running.
 
         :param nodes: The set of execution nodes that have been executed
         :return:
         """
+        self.exit_code = 0
         for node in nodes:
+            node.set_exit_code()
+            if node.exit_code is None:
+                self.exit_code = None
+                return
             if node.exit_code:
                 self.exit_code = node.exit_code
 
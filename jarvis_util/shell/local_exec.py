@@ -4,13 +4,32 @@ is intended to be called from Exec, not by general users.
 """
 
 import time
+import errno
 import subprocess
 import os
 import sys
-import io
+import re
+import shlex
+import codecs
+import fcntl
+import selectors
 import threading
 from jarvis_util.jutil_manager import JutilManager
-from .exec_info import ExecInfo, ExecType, Executable
+from .exec_info import ExecInfo, ExecType, Executable, find_binary
+
+_SHELL_CHARS_RE = re.compile(r'[;&|<>$`*?!~#(){}\[\]\\\n]')
+_SHELL_RETRY_ERRNOS = (errno.ENOEXEC, errno.ENOENT, errno.EACCES)
+# Shell builtins and reserved words, some of which also exist as binaries
+# (e.g., /usr/bin/echo or /usr/bin/time) that behave differently. These
+# always run through the shell.
+_SHELL_BUILTINS = frozenset([
+    'alias', 'bg', 'break', 'cd', 'command', 'continue', 'echo', 'eval',
+    'exec', 'exit', 'export', 'false', 'fc', 'fg', 'getopts', 'hash',
+    'jobs', 'kill', 'local', 'printf', 'pwd', 'read', 'readonly', 'return',
+    'set', 'shift', 'test', 'times', 'trap', 'true', 'type', 'ulimit',
+    'umask', 'unalias', 'unset', 'wait',
+    'case', 'coproc', 'do', 'done', 'elif', 'else', 'esac', 'fi', 'for',
+    'function', 'if', 'in', 'select', 'then', 'time', 'until', 'while'])
 
 
 class LocalExec(Executable):
@@ -32,33 +51,31 @@ class LocalExec(Executable):
         self.collect_output = exec_info.collect_output
         self.pipe_stdout = exec_info.pipe_stdout
         self.pipe_stderr = exec_info.pipe_stderr
-        self.pipe_stdout_fp = None
-        self.pipe_stderr_fp = None
+        self.pipe_stdout_fp = self.open_pipe(self.pipe_stdout)
+        self.pipe_stderr_fp = self.open_pipe(self.pipe_stderr)
         self.hide_output = exec_info.hide_output
-        # pylint: disable=R1732
         if self.collect_output is None:
             self.collect_output = self.jutil.collect_output
-        if self.pipe_stdout is not None:
-            self.pipe_stdout_fp = open(self.pipe_stdout, 'wb')
-        if self.pipe_stderr is not None:
-            self.pipe_stderr_fp = open(self.pipe_stderr, 'wb')
         if self.hide_output is None:
             self.hide_output = self.jutil.hide_output
-        # pylint: enable=R1732
-        self.stdout = io.StringIO()
-        self.stderr = io.StringIO()
+        self.stdout = []
+        self.stderr = []
         self.last_stdout_size = 0
         self.last_stderr_size = 0
-        self.print_stdout_thread = None
-        self.print_stderr_thread = None
+        self.print_thread = None
+        self.partial_lines = {'stdout': '', 'stderr': ''}
         self.exit_code = 0
 
         # Copy ENV
         self.basic_env = exec_info.basic_env.copy()
-        self.env = exec_info.env.copy()
-        for key, val in os.environ.items():
-            if key not in self.env:
-                self.env[key] = val
+        # Inherit the environment unmodified when possible (env=None).
+        # Popen(env=None) inherits the live os.environ, so compare
+        # against and merge with the live os.environ as well.
+        environ = os.environ
+        if all(environ.get(key) == val for key, val in exec_info.env.items()):
+            self.env = None
+        else:
+            self.env = {**environ, **exec_info.env}
 
         # Managing command execution
         self.sudo = exec_info.sudo
@@ -71,7 +88,7 @@ class LocalExec(Executable):
             self.cwd = exec_info.cwd
 
         # Create the command
-        cmd = self.smash_cmd(cmd, self.sudo, self.basic_env, exec_info.sudoenv)
+        cmd = self.prefix_cmd(cmd, exec_info.cmd_prefix)
         if exec_info.do_dbg:
             cmd = self.get_dbg_cmd(cmd, exec_info.dbg_port)
         self.cmd = cmd
@@ -81,27 +98,69 @@ class LocalExec(Executable):
 
     def _start_bash_processes(self):
         time.sleep(self.sleep_ms)
-        # pylint: disable=R1732
-        self.proc = subprocess.Popen(self.cmd,
-                                     stdin=self.stdin,
-                                     stdout=subprocess.PIPE,
-                                     stderr=subprocess.PIPE,
-                                     cwd=self.cwd,
-                                     env=self.env,
-                                     shell=True)
-        # pylint: enable=R1732
-        self.print_stdout_thread = threading.Thread(
-            target=self.print_stdout_worker)
-        self.print_stderr_thread = threading.Thread(
-            target=self.print_stderr_worker)
-        self.print_stdout_thread.start()
-        self.print_stderr_thread.start()
+        argv = self._get_argv()
+        self.proc = None
+        if argv is not None:
+            try:
+                self.proc = self._popen(argv, shell=False)
+            except OSError as err:
+                # E.g., a script without a shebang or a binary which has
+                # left PATH. The shell knows how to run (or report) these.
+                if err.errno not in _SHELL_RETRY_ERRNOS:
+                    raise
+        if self.proc is None:
+            self.proc = self._popen(self.cmd, shell=True)
+        for pipe in [self.proc.stdout, self.proc.stderr]:
+            flags = fcntl.fcntl(pipe.fileno(), fcntl.F_GETFL)
+            fcntl.fcntl(pipe.fileno(), fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        self.print_thread = threading.Thread(target=self.print_worker,
+                                             daemon=True)
+        self.print_thread.start()
         if not self.exec_async:
             self.wait()
 
+    def _popen(self, cmd, shell):
+        # pylint: disable=R1732
+        return subprocess.Popen(cmd,
+                                stdin=self.stdin,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE,
+                                cwd=self.cwd,
+                                env=self.env,
+                                shell=shell)
+        # pylint: enable=R1732
+
+    def _get_argv(self):
+        """
+        Split the command into arguments if it can be executed directly,
+        without starting a shell. This is the case if the command has no
+        shell syntax, is not a shell builtin, and the binary it runs can
+        be found.
+
+        :return: A list of arguments, or None if a shell is required
+        """
+        if not isinstance(self.cmd, str) or _SHELL_CHARS_RE.search(self.cmd):
+            return None
+        try:
+            argv = shlex.split(self.cmd)
+        except ValueError:
+            return None
+        if len(argv) == 0 or '=' in argv[0] or argv[0] in _SHELL_BUILTINS:
+            return None
+        if '/' in argv[0]:
+            binary = os.path.join(self.cwd, argv[0])
+            if not os.path.isfile(binary) or not os.access(binary, os.X_OK):
+                return None
+        else:
+            # Key the cache on the PATH the command will run with
+            env = self.env if self.env is not None else os.environ
+            if find_binary(argv[0], env.get('PATH')) is None:
+                return None
+        return argv
+
     def wait(self):
-        # self.proc.wait()
         self.join_print_worker()
+        self.proc.wait()
         self.set_exit_code()
         return self.exit_code
 
@@ -114,49 +173,84 @@ class LocalExec(Executable):
         else:
             return None
 
-    def print_stdout_worker(self):
-        while self.proc.poll() is None:
-            self.print_to_outputs(self.proc.stdout, self.stdout,
-                                  self.pipe_stdout_fp, sys.stdout)
-            time.sleep(25 / 1000)
-        self.print_to_outputs(self.proc.stdout, self.stdout,
-                              self.pipe_stdout_fp, sys.stdout)
-
-    def print_stderr_worker(self):
-        while self.proc.poll() is None:
-            self.print_to_outputs(self.proc.stderr, self.stderr,
-                                  self.pipe_stderr_fp, sys.stderr)
-            time.sleep(25 / 1000)
-        self.print_to_outputs(self.proc.stderr, self.stderr,
-                              self.pipe_stderr_fp, sys.stderr)
-
-    def print_to_outputs(self, proc_sysout, self_sysout, file_sysout, sysout):
+    def print_worker(self):
+        """
+        Forward the output of the process as it arrives. A single
+        selector watches both STDOUT and STDERR until they reach EOF.
+
+        :return: None
+        """
+        sel = selectors.DefaultSelector()
+        sel.register(self.proc.stdout.fileno(), selectors.EVENT_READ,
+                     (codecs.getincrementaldecoder('utf-8')('replace'),
+                      self.stdout, self.pipe_stdout_fp, 'stdout',
+                      sys.stdout))
+        sel.register(self.proc.stderr.fileno(), selectors.EVENT_READ,
+                     (codecs.getincrementaldecoder('utf-8')('replace'),
+                      self.stderr, self.pipe_stderr_fp, 'stderr',
+                      sys.stderr))
+        while sel.get_map():
+            for key, _ in sel.select():
+                try:
+                    data = os.read(key.fd, 65536)
+                except BlockingIOError:
+                    continue
+                decoder = key.data[0]
+                if not data:
+                    sel.unregister(key.fd)
+                    text = decoder.decode(b'', final=True)
+                else:
+                    text = decoder.decode(data)
+                self.print_to_outputs(data, text, *key.data[1:])
+        sel.close()
+
+    def print_to_outputs(self, data, text, self_sysout, file_sysout, pipe,
+                         sysout):
         # pylint: disable=W0702
-        for line in proc_sysout:
-            try:
-                text = line.decode('utf-8')
-                if not self.hide_output:
-                    sysout.write(text)
-                if self.collect_output:
-                    self_sysout.write(text)
-                    self_sysout.flush()
-                if file_sysout is not None:
-                    file_sysout.write(line)
-            except:
-                return
+        try:
+            if not self.hide_output:
+                # Only print complete lines until EOF
+                lines = self.partial_lines[pipe] + text
+                if data:
+                    end = lines.rfind('\n') + 1
+                    self.partial_lines[pipe] = lines[end:]
+                    lines = lines[:end]
+                if lines:
+                    sysout.write(lines)
+            if self.collect_output:
+                self_sysout.append(text)
+            if data and file_sysout is not None:
+                file_sysout.write(data)
+        except:
+            pass
         # pylint: enable=W0702
 
+    @staticmethod
+    def open_pipe(path):
+        """
+        Open the file that a stream is piped into. The file is truncated
+        before the command starts, and all writes append to its end, so
+        output which the command writes to the file itself (e.g., sbatch
+        --output) is not overwritten.
+
+        :param path: The path to the pipe file, or None
+        :return: The file, or None if the stream is not piped
+        """
+        if path is None:
+            return None
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC |
+                     os.O_APPEND, 0o666)
+        return os.fdopen(fd, 'ab')
+
     def join_print_worker(self):
         if isinstance(self.stdout, str):
             return
-        self.print_stdout_thread.join()
-        self.print_stderr_thread.join()
-        self.stdout = self.stdout.getvalue()
-        self.stderr = self.stderr.getvalue()
-        if self.pipe_stdout_fp is not None:
-            self.pipe_stdout_fp.close()
-        if self.pipe_stderr_fp is not None:
-            self.pipe_stderr_fp.close()
+        self.print_thread.join()
+        self.stdout = ''.join(self.stdout)
+        self.stderr = ''.join(self.stderr)
+        for file_sysout in [self.pipe_stdout_fp, self.pipe_stderr_fp]:
+            if file_sysout is not None:
+                file_sysout.close()
 
 
 class LocalExecInfo(ExecInfo):
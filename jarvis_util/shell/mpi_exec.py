@@ -7,7 +7,7 @@ not by general users.
 
 from jarvis_util.jutil_manager import JutilManager
 from jarvis_util.shell.local_exec import LocalExec
-from .exec_info import ExecInfo, ExecType
+from .exec_info import ExecInfo, ExecType, find_binary
 from abc import abstractmethod
 
 
@@ -17,6 +17,22 @@ class MpiVersion(LocalExec):
     mpirun --version
     """
 
+    versions_ = {}
+
+    @staticmethod
+    def get(exec_info):
+        """
+        Get the MPI implementation. Each mpiexec binary is only
+        introspected the first time it is seen.
+
+        :param exec_info: Info needed to execute mpiexec
+        :return: The ExecType of the MPI implementation
+        """
+        mpiexec = find_binary('mpiexec', exec_info.basic_env.get('PATH'))
+        if mpiexec not in MpiVersion.versions_:
+            MpiVersion.versions_[mpiexec] = MpiVersion(exec_info).version
+        return MpiVersion.versions_[mpiexec]
+
     def __init__(self, exec_info):
         self.cmd = 'mpiexec --version'
         super().__init__(self.cmd,
@@ -43,10 +43,10 @@ class PbsExec(LocalExec):
                          exec_info.mod(env=exec_info.basic_env))
 
     def generate_qsub_command(self):
-        cmd = 'qsub'
+        params = ['qsub']
 
         if self.interactive:
-            cmd += ' -I'
+            params.append('-I')
 
         equal_map = {
             'filesystems': 'l filesystems',
@@ -60,24 +60,24 @@ class PbsExec(LocalExec):
         }
 
         if self.nnodes and self.system:
-            cmd += f' -l select={self.nnodes}:system={self.system}'
+            params.append(f'-l select={self.nnodes}:system={self.system}')
         elif self.nnodes:
-            cmd += f' -l select={self.nnodes}'
+            params.append(f'-l select={self.nnodes}')
         else:
             raise ValueError("System defined without select value.")
 
         for attr, option in equal_map.items():
             value = getattr(self, attr)
             if value is not None:
-                cmd += f' -{option}={value}'
+                params.append(f'-{option}={value}')
 
         for attr, option in non_equal_map.items():
             value = getattr(self, attr)
             if value is not None:
-                cmd += f' -{option} {value}'
+                params.append(f'-{option} {value}')
 
-        cmd += f' -- \"{self.bash_script}\"'
-        return cmd
+        params.append(f'-- \"{self.bash_script}\"')
+        return ' '.join(params)
 
     def pbscmd(self):
 
@@ -97,13 +97,14 @@ class PbsExec(LocalExec):
 
 
 class PbsExecInfo(ExecInfo):
+    allowed_options = ('interactive', 'nnodes', 'system', 'filesystems',
+                       'walltime', 'account', 'queue', 'env_vars', 'bash_script')
+    keys = ExecInfo.keys + allowed_options
+
     def __init__(self, **kwargs):
         super().__init__(exec_type=ExecType.PBS, **kwargs)
-        allowed_options = ['interactive', 'nnodes', 'system', 'filesystems',
-                           'walltime', 'account', 'queue', 'env_vars', 'bash_script']
-        self.keys += allowed_options
         # We use output and error file from the base Exec Info
-        for key in allowed_options:
+        for key in self.allowed_options:
             if key in kwargs:
                 setattr(self, key, kwargs[key])
             else:
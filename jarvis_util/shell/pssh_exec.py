@@ -18,7 +18,9 @@ class PsshExec(Executable):
         """
         Execute commands on multiple hosts.
 
-        :param cmd: A list of commands or a single command string
+        :param cmd: A list of commands or a single command string.
+        Alternatively, a dict mapping each host to the command(s) it should
+        run. The commands for a host are sent over a single connection.
         :param exec_info: Info needed to execute command with SSH
         """
         super().__init__()
@@ -28,7 +30,16 @@ class PsshExec(Executable):
         self.stdout = {}
         self.stderr = {}
         self.is_local = exec_info.hostfile.is_local()
-        if not self.is_local:
+        if isinstance(cmd, dict):
+            self.hosts = list(cmd.keys())
+            self.is_local = False
+            for host, host_cmd in cmd.items():
+                ssh_exec_info = exec_info.mod(hostfile=None,
+                                              hosts=host,
+                                              exec_async=True,
+                                              do_dbg=False)
+                self.execs_.append(SshExec(host_cmd, ssh_exec_info))
+        elif not self.is_local:
             dbg_cmd = cmd
             if exec_info.do_dbg:
                 dbg_cmd = self.get_dbg_cmd(cmd, exec_info.dbg_port)
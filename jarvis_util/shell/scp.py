@@ -4,6 +4,7 @@ This class is intended to be called from Exec, not by general users.
 """
 from .local_exec import LocalExec
 from .exec_info import Executable
+from .ssh_pool import SshConnectionPool
 from jarvis_util.jutil_manager import JutilManager
 
 
@@ -37,12 +38,14 @@ class _Scp(LocalExec):
 
     def rsync_cmd(self, src_path, dst_path):
         lines = ['rsync -ha']
-        if self.pkey is not None or self.port is not None:
-            ssh_lines = ['ssh']
-            if self.pkey is not None:
-                ssh_lines.append(f'-i {self.pkey}')
-            if self.port is not None:
-                ssh_lines.append(f'-p {self.port}')
+        ssh_lines = ['ssh']
+        ssh_lines += SshConnectionPool.get_instance().ssh_opts(
+            self.addr, user=self.user, port=self.port, pkey=self.pkey)
+        if self.pkey is not None:
+            ssh_lines.append(f'-i {self.pkey}')
+        if self.port is not None:
+            ssh_lines.append(f'-p {self.port}')
+        if len(ssh_lines) > 1:
             ssh_cmd = ' '.join(ssh_lines)
             lines.append(f'-e \'{ssh_cmd}\'')
         lines.append(src_path)
@@ -5,10 +5,13 @@ on the system. This class is intended to be called from Exec,
 not by general users.
 """
 
+import re
 from jarvis_util.jutil_manager import JutilManager
 from jarvis_util.shell.local_exec import LocalExec, LocalExecInfo
 from .exec_info import ExecInfo, ExecType
 
+_JOBID_RE = re.compile(r'Submitted batch job (\d+)')
+
 
 class SlurmExec(LocalExec):
     """
@@ -37,12 +40,35 @@ class SlurmExec(LocalExec):
         self.exclusive = exec_info.exclusive
         self.host_suffix = exec_info.host_suffix
         self.nodelist = exec_info.nodelist
+        self.job_id = None
+        # sbatch's stdout, kept even if the caller does not collect output
+        self._sbatch_stdout = []
 
         super().__init__(self.slurmcmd(),
                          exec_info.mod(env=exec_info.basic_env))
 
+    def wait(self):
+        """
+        Wait for sbatch to submit the job. job_id is set from sbatch's
+        "Submitted batch job <id>" line, whether or not output is collected.
+
+        :return: The exit code of sbatch
+        """
+        super().wait()
+        match = _JOBID_RE.search(''.join(self._sbatch_stdout))
+        if match is not None:
+            self.job_id = int(match.group(1))
+        return self.exit_code
+
+    def print_to_outputs(self, data, text, self_sysout, file_sysout, pipe,
+                         sysout):
+        if pipe == 'stdout':
+            self._sbatch_stdout.append(text)
+        super().print_to_outputs(data, text, self_sysout, file_sysout, pipe,
+                                 sysout)
+
     def generate_sbatch_command(self):
-        cmd = "sbatch"
+        params = ["sbatch"]
 
         # Mapping of attribute names to their corresponding sbatch option names
         options_map = {
@@ -65,12 +91,12 @@ class SlurmExec(LocalExec):
             value = getattr(self, attr)
             if value is not None:
                 if value is True:  # For options like 'exclusive' that don't take a value
-                    cmd += f" --{option}"
+                    params.append(f"--{option}")
                 else:
-                    cmd += f" --{option}={value}"
+                    params.append(f"--{option}={value}")
 
-        cmd += f" {self.cmd}"
-        return cmd
+        params.append(self.cmd)
+        return ' '.join(params)
 
     def slurmcmd(self):
         cmd = self.generate_sbatch_command()
@@ -81,13 +107,14 @@ class SlurmExec(LocalExec):
 
 
 class SlurmExecInfo(ExecInfo):
+    allowed_options = ('job_name', 'num_nodes', 'cpus_per_task', 'time', 'partition', 'mail_type',
+                       'mail_user', 'mem', 'gres', 'exclusive', 'host_suffix', 'nodelist')
+    keys = ExecInfo.keys + allowed_options
+
     def __init__(self, job_name=None, num_nodes=1, **kwargs):
         super().__init__(exec_type=ExecType.SLURM, **kwargs)
-        allowed_options = ['job_name', 'num_nodes', 'cpus_per_task', 'time', 'partition', 'mail_type',
-                           'mail_user', 'mem', 'gres', 'exclusive', 'host_suffix', 'nodelist']
-        self.keys += allowed_options
         # We use ppn, and the output and error file from the base Exec Info
-        for key in allowed_options:
+        for key in self.allowed_options:
             if key in kwargs:
                 setattr(self, key, kwargs[key])
             else:
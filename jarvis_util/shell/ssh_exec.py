@@ -2,8 +2,10 @@
 This module provides methods to execute a single command remotely using SSH.
 This class is intended to be called from Exec, not by general users.
 """
+import shlex
 from .local_exec import LocalExec
 from .exec_info import ExecInfo, ExecType
+from .ssh_pool import SshConnectionPool
 
 
 class SshExec(LocalExec):
@@ -26,16 +28,35 @@ class SshExec(LocalExec):
         self.sudo = exec_info.sudo
         self.ssh_env = exec_info.env
         self.basic_env = exec_info.env
-        cmd = self.smash_cmd(cmd, self.sudo, self.basic_env, exec_info.sudoenv)
-        if not exec_info.hostfile.is_local():
+        is_local = exec_info.hostfile.is_local()
+        if not is_local and isinstance(cmd, (list, tuple)) and len(cmd) > 1:
+            cmd = self.batch_cmd(cmd)
+        # Unlike cmd_prefix, forward the full env (e.g., LD_PRELOAD) to sudo
+        cmd = self.smash_cmd(cmd, self.sudo, self.basic_env,
+                             exec_info.sudoenv)
+        if not is_local:
             super().__init__(self.ssh_cmd(cmd),
                              exec_info.mod(env=exec_info.basic_env,
                                            sudo=False))
         else:
             super().__init__(cmd, exec_info.mod(sudo=False))
 
+    def batch_cmd(self, cmds):
+        """
+        Pack a list of commands into a single command, so they all run
+        on the remote host over one connection. The script is quoted
+        twice: once for the local shell and once for the remote shell.
+
+        :param cmds: A list of commands
+        :return: A single command string
+        """
+        script = shlex.quote('\n'.join(cmds))
+        return f'bash -c {shlex.quote(script)}'
+
     def ssh_cmd(self, cmd):
         lines = ['ssh']
+        lines += SshConnectionPool.get_instance().ssh_opts(
+            self.addr, user=self.user, port=self.port, pkey=self.pkey)
         if self.pkey is not None:
             lines.append(f'-i {self.pkey}')
         if self.port is not None:
@@ -0,0 +1,241 @@
+"""
+This module tracks the persistent SSH connections opened by jarvis-util.
+Commands sent to the same host multiplex over a single OpenSSH
+ControlMaster instead of performing a new handshake each time.
+This class is intended to be called from SshExec and Scp, not by
+general users.
+"""
+
+import atexit
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from jarvis_util.jutil_manager import JutilManager
+
+
+class SshConnectionPool:
+    """
+    A singleton which stores the SSH control masters used by this process.
+    Masters are keyed by (user, host, port, pkey) and are stopped when
+    the process exits.
+
+    The pool starts each master itself, detached from the pipes of the
+    command which requested it, and restarts it if it exits. A master
+    which fails to connect is not retried for retry_interval seconds.
+    Commands only ever attach to a master (ControlMaster=no), so a
+    command whose master is not up simply opens its own connection.
+    """
+
+    instance_ = None
+
+    @staticmethod
+    def get_instance():
+        if SshConnectionPool.instance_ is None:
+            SshConnectionPool.instance_ = SshConnectionPool()
+        return SshConnectionPool.instance_
+
+    def __init__(self):
+        self.control_dir = None
+        self.control_persist = '600s'
+        self.close_timeout = 10
+        self.retry_interval = 300
+        self.masters = {}
+        self.failed = {}
+        self.control_paths = {}
+        self.lock = threading.Lock()
+        atexit.register(self.close_all)
+
+    def control_path(self, host, user=None, port=None, pkey=None):
+        """
+        The ControlPath of the master for a host. The sockets live in a
+        private directory, so no other process can own or stop them.
+
+        :param host: The host to connect to
+        :param user: The user to connect as
+        :param port: The port to connect to
+        :param pkey: The path to the private key
+        :return: The path to the control socket
+        """
+        key = (user, host, port, pkey)
+        if key not in self.control_paths:
+            if self.control_dir is None:
+                self.control_dir = tempfile.mkdtemp(prefix='jarvis-ssh-')
+            self.control_paths[key] = \
+                f'{self.control_dir}/cm-{len(self.control_paths)}'
+        return self.control_paths[key]
+
+    def ssh_opts(self, host, user=None, port=None, pkey=None):
+        """
+        Get the options which make ssh reuse the connection to a host.
+        A master is started in the background on the first call for a
+        host, and again whenever the previous one has exited (e.g.,
+        ControlPersist expired). If the previous one failed to connect,
+        the next master is only started once retry_interval has passed.
+
+        :param host: The host to connect to
+        :param user: The user to connect as
+        :param port: The port to connect to
+        :param pkey: The path to the private key
+        :return: A list of ssh options
+        """
+        if not JutilManager.get_instance().ssh_control_master:
+            return []
+        with self.lock:
+            key = (user, host, port, pkey)
+            path = self.control_path(host, user=user, port=port, pkey=pkey)
+            if not self.is_alive(key) and not self.is_failed(key):
+                self.masters[key] = self.start_master(host, user=user,
+                                                      port=port, pkey=pkey)
+            return ['-o ControlMaster=no', f'-o ControlPath={path}']
+
+    def is_alive(self, key):
+        """
+        Whether the master for a key is connecting or connected.
+        "ssh -f" exits with 0 once the master is in the background.
+        A master which was killed (e.g., SIGKILL or the OOM killer)
+        leaves its socket behind, so the socket must also accept a
+        connection. A stale socket is removed, so a new master can
+        take its place.
+
+        :param key: The (user, host, port, pkey) of the master
+        :return: True or False
+        """
+        master = self.masters.get(key)
+        if master is None:
+            return False
+        code = master.poll()
+        if code is None:
+            return True
+        if code != 0:
+            return False
+        path = self.control_paths[key]
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(path)
+                return True
+            except OSError:
+                pass
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return False
+
+    def is_failed(self, key):
+        """
+        Whether the master for a key failed to connect less than
+        retry_interval seconds ago. Masters run in BatchMode, so they
+        fail every time on hosts which need a password or have an
+        unknown host key. Retrying those on every command would double
+        the authentication attempts made against the host.
+
+        :param key: The (user, host, port, pkey) of the master
+        :return: True or False
+        """
+        if key in self.masters:
+            master = self.masters[key]
+            if master is None or master.poll() not in (None, 0):
+                del self.masters[key]
+                self.failed[key] = time.time()
+        if key not in self.failed:
+            return False
+        if time.time() - self.failed[key] < self.retry_interval:
+            return True
+        del self.failed[key]
+        return False
+
+    def start_master(self, host, user=None, port=None, pkey=None):
+        """
+        Start the master for a host without waiting for it to connect.
+        Its stdio is /dev/null, so it never holds a command's
+        output pipes open.
+
+        :param host: The host to connect to
+        :param user: The user to connect as
+        :param port: The port to connect to
+        :param pkey: The path to the private key
+        :return: The Popen of the master, or None if ssh failed to start
+        """
+        path = self.control_path(host, user=user, port=port, pkey=pkey)
+        cmd = ['ssh', '-MNf',
+               '-o', 'BatchMode=yes',
+               '-o', f'ControlPath={path}',
+               '-o', f'ControlPersist={self.control_persist}']
+        cmd += self._dest_args(host, user, port, pkey)
+        try:
+            return subprocess.Popen(cmd, stdin=subprocess.DEVNULL,
+                                    stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.DEVNULL)
+        except OSError:
+            return None
+
+    def close(self, host, user=None, port=None, pkey=None):
+        """
+        Ask the master for a host to stop accepting new sessions.
+        It exits once the sessions still attached to it complete.
+
+        :param host: The host to connect to
+        :param user: The user to connect as
+        :param port: The port to connect to
+        :param pkey: The path to the private key
+        :return: None
+        """
+        self._close([(user, host, port, pkey)])
+
+    def close_all(self):
+        """
+        Stop every master started by this process. The masters are
+        stopped in parallel.
+
+        :return: None
+        """
+        self._close(list(self.masters))
+        if self.control_dir is not None:
+            shutil.rmtree(self.control_dir, ignore_errors=True)
+            self.control_dir = None
+        self.control_paths = {}
+
+    def _close(self, keys):
+        stops = []
+        for key in keys:
+            user, host, port, pkey = key
+            master = self.masters.pop(key, None)
+            self.failed.pop(key, None)
+            if master is not None:
+                # Reap the foreground half of "ssh -f"
+                stops.append(master)
+            path = self.control_path(host, user=user, port=port, pkey=pkey)
+            cmd = ['ssh', '-O', 'stop', '-o', f'ControlPath={path}']
+            cmd += self._dest_args(host, user, port, pkey)
+            # pylint: disable=R1732
+            try:
+                stops.append(subprocess.Popen(cmd, stdin=subprocess.DEVNULL,
+                                              stdout=subprocess.DEVNULL,
+                                              stderr=subprocess.DEVNULL))
+            except OSError:
+                pass
+            # pylint: enable=R1732
+        deadline = time.time() + self.close_timeout
+        for proc in stops:
+            try:
+                proc.wait(timeout=max(deadline - time.time(), 0))
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+    @staticmethod
+    def _dest_args(host, user, port, pkey):
+        args = []
+        if pkey is not None:
+            args += ['-i', pkey]
+        if port is not None:
+            args += ['-p', str(port)]
+        if user is not None:
+            args.append(f'{user}@{host}')
+        else:
+            args.append(host)
+        return args
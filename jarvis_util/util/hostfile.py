@@ -7,6 +7,8 @@ import socket
 import re
 import itertools
 
+_BRACKET_RE = re.compile(r'[\[\]]')
+
 
 class Hostfile:
     """
@@ -92,7 +94,7 @@ class Hostfile:
         :param line: the line to parse
         :return: None
         """
-        toks = re.split(r'[\[\]]', line)
+        toks = _BRACKET_RE.split(line)
         brkts = [tok for i, tok in enumerate(toks) if i % 2 == 1]
         num_set = []
 
@@ -173,7 +175,20 @@ class Hostfile:
         return sub
 
     def copy(self):
-        return self.subset(len(self))
+        """
+        Copy this hostfile. Host IPs are copied rather than resolved
+        again, and the copy does not share any lists with the original.
+
+        :return: Hostfile
+        """
+        new = Hostfile(all_hosts=[], find_ips=False)
+        new.path = self.path
+        new.find_ips = self.find_ips
+        new.all_hosts = list(self.all_hosts)
+        new.all_hosts_ip = list(self.all_hosts_ip)
+        new.hosts = list(self.hosts)
+        new.hosts_ip = list(self.hosts_ip)
+        return new
 
     def is_subset(self):
         return len(self.hosts) != len(self.all_hosts)
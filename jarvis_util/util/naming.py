@@ -5,6 +5,9 @@ naming convention.
 
 import re
 
+_SEPARATOR_RE = re.compile(r'(_|-)+')
+_CAPITAL_WORD_RE = re.compile('([A-Z][a-z0-9_]*)')
+
 
 def to_camel_case(string):
     """
@@ -15,7 +18,7 @@ def to_camel_case(string):
     """
     if string is None:
         return
-    words = re.sub(r'(_|-)+', ' ', string).split()
+    words = _SEPARATOR_RE.sub(' ', string).split()
     words = [word.capitalize() for word in words]
     return ''.join(words)
 
@@ -28,7 +31,7 @@ def to_snake_case(string):
     """
     if string is None:
         return
-    words = re.split('([A-Z][a-z0-9_]*)', string)
+    words = _CAPITAL_WORD_RE.split(string)
     words = [word for word in words if len(word)]
     string = '_'.join(words)
     return string.lower()
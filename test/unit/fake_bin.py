@@ -0,0 +1,52 @@
+"""
+Helpers for tests which run fake executables (e.g., ssh or sbatch).
+Every temporary directory is removed when the test finishes.
+"""
+import os
+import shutil
+import tempfile
+
+
+def make_tmpdir(test):
+    """
+    Create a temporary directory which is removed after the test.
+
+    :param test: The running TestCase
+    :return: The path to the directory
+    """
+    tmpdir = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+    return tmpdir
+
+
+def make_script(tmpdir, name, text):
+    """
+    Write an executable script into a directory.
+
+    :param tmpdir: The directory to write the script into
+    :param name: The name of the script
+    :param text: The contents of the script
+    :return: The path to the script
+    """
+    path = os.path.join(tmpdir, name)
+    with open(path, 'w') as fp:
+        fp.write(text)
+    os.chmod(path, 0o755)
+    return path
+
+
+def fake_bin(test, name, text):
+    """
+    Place an executable script first on PATH until the test finishes.
+
+    :param test: The running TestCase
+    :param name: The name of the executable
+    :param text: The contents of the script
+    :return: The temporary directory holding the script
+    """
+    tmpdir = make_tmpdir(test)
+    make_script(tmpdir, name, text)
+    old_path = os.environ['PATH']
+    os.environ['PATH'] = f'{tmpdir}:{old_path}'
+    test.addCleanup(os.environ.__setitem__, 'PATH', old_path)
+    return tmpdir
@@ -1,6 +1,9 @@
 from jarvis_util.util.hostfile import Hostfile
+from jarvis_util.shell.exec_info import ExecInfo
 import pathlib
-from unittest import TestCase
+import os
+import tempfile
+from unittest import TestCase, mock
 
 
 class TestHostfile(TestCase):
@@ -55,3 +58,53 @@ class TestHostfile(TestCase):
                                  find_ips=False)
         self.assertEqual(len(hf_sub_reload), 4)
         self.assertEqual(hf_sub, hf_sub_reload)
+
+    def _write_hostfile(self, path, text, mtime):
+        with open(path, 'w', encoding='utf-8') as fp:
+            fp.write(text)
+        os.utime(path, (mtime, mtime))
+
+    def test_reload_edited_hostfile(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'hostfile.txt')
+            self._write_hostfile(path, 'localhost\n', 1000)
+            self.assertEqual(len(ExecInfo(hostfile=path).hostfile), 1)
+            # Same mtime: served from the cache
+            self.assertEqual(len(ExecInfo(hostfile=path).hostfile), 1)
+            self._write_hostfile(path, 'localhost\n127.0.0.1\n', 2000)
+            hf = ExecInfo(hostfile=path).hostfile
+            self.assertEqual(hf.hosts, ['localhost', '127.0.0.1'])
+
+    def test_relative_hostfile_after_chdir(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name, text in [('a', 'localhost\n'),
+                               ('b', 'localhost\n127.0.0.1\n')]:
+                os.mkdir(os.path.join(tmpdir, name))
+                self._write_hostfile(os.path.join(tmpdir, name, 'hosts'),
+                                     text, 1000)
+            try:
+                os.chdir(os.path.join(tmpdir, 'a'))
+                self.assertEqual(len(ExecInfo(hostfile='hosts').hostfile), 1)
+                os.chdir(os.path.join(tmpdir, 'b'))
+                self.assertEqual(len(ExecInfo(hostfile='hosts').hostfile), 2)
+            finally:
+                os.chdir(cwd)
+
+    def test_cached_hostfile_copy(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'hostfile.txt')
+            self._write_hostfile(path, 'localhost\n', 1000)
+            ExecInfo(hostfile=path)
+            ExecInfo(hosts=['localhost'])
+            # A cache hit does not resolve any host again
+            with mock.patch('socket.gethostbyname') as resolve:
+                hf = ExecInfo(hostfile=path).hostfile
+                ExecInfo(hosts=['localhost'])
+            resolve.assert_not_called()
+            # Nor does it share lists with the cached hostfile
+            hf.all_hosts.append('node-01')
+            hf.all_hosts_ip.append('10.0.0.1')
+            hf = ExecInfo(hostfile=path).hostfile
+            self.assertEqual(hf.all_hosts, ['localhost'])
+            self.assertEqual(len(hf.all_hosts_ip), 1)
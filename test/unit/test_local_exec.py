@@ -1,8 +1,11 @@
 import pathlib
 import os
+import subprocess
 from jarvis_util.shell.local_exec import LocalExec, LocalExecInfo
+from jarvis_util.shell.pssh_exec import PsshExecInfo
 from jarvis_util.shell.exec import Exec
-from unittest import TestCase
+from unittest import TestCase, mock
+from fake_bin import fake_bin, make_script, make_tmpdir
 
 
 class TestLocalExec(TestCase):
@@ -23,6 +26,21 @@ class TestLocalExec(TestCase):
         self.assertEqual(ret.exit_code, 0)
         self.assertEqual(len(ret.stdout['localhost']), 0)
 
+    def test_pssh_exit_code(self):
+        ret = Exec("echo hello", PsshExecInfo(hosts='localhost'))
+        self.assertEqual(ret.exit_code, 0)
+        self.assertFalse(ret.failed())
+        ret = Exec("exit 3", PsshExecInfo(hosts='localhost'))
+        self.assertEqual(ret.exit_code, 3)
+
+    def test_pssh_exit_code_async(self):
+        ret = Exec("sleep 1; exit 3",
+                   PsshExecInfo(hosts='localhost', exec_async=True))
+        self.assertIsNone(ret.exit_code)
+        self.assertTrue(ret.failed())
+        ret.wait()
+        self.assertEqual(ret.exit_code, 3)
+
     def test_pipe_stdout(self):
         self._setup_files()
         spawn_info = LocalExecInfo(pipe_stdout=self.stdout,
@@ -34,6 +52,26 @@ class TestLocalExec(TestCase):
         self.assertFile(self.stdout, "hello")
         self.assertFile(self.stderr, "")
 
+    def test_pipe_stdout_opened_once(self):
+        self._setup_files()
+        with mock.patch('os.open', wraps=os.open) as os_open:
+            Exec("echo hello", LocalExecInfo(pipe_stdout=self.stdout,
+                                             hide_output=True))
+        opens = [call for call in os_open.call_args_list
+                 if call.args[0] == self.stdout]
+        self.assertEqual(len(opens), 1)
+        self.assertFile(self.stdout, "hello")
+
+    def test_pipe_stdout_unwritable(self):
+        tmpdir = make_tmpdir(self)
+        marker = os.path.join(tmpdir, 'ran_marker')
+        with self.assertRaises(FileNotFoundError):
+            Exec(f"touch {marker}",
+                 LocalExecInfo(pipe_stdout='/nonexistent/dir/x'))
+        with self.assertRaises(IsADirectoryError):
+            Exec(f"touch {marker}", LocalExecInfo(pipe_stderr=tmpdir))
+        self.assertFalse(os.path.exists(marker))
+
     def test_hide_stdout(self):
         HERE = str(pathlib.Path(__file__).parent.resolve())
         PRINTNONE = os.path.join(HERE, 'printNone.py')
@@ -54,6 +92,128 @@ class TestLocalExec(TestCase):
         self.assertFile(self.stdout, stdout_data)
         self.assertFile(self.stderr, stderr_data)
 
+    def _make_script(self, name, text):
+        tmpdir = make_tmpdir(self)
+        return tmpdir, make_script(tmpdir, name, text)
+
+    def test_quoted_arg(self):
+        # Not a builtin, so the command is split and executed directly
+        fake_bin(self, 'jutil_args',
+                 '#!/bin/sh\nfor arg; do printf "%s," "$arg"; done\n')
+        node = LocalExec("jutil_args 'a b' \"c d\"",
+                         LocalExecInfo(collect_output=True, hide_output=True))
+        self.assertEqual(node._get_argv(), ['jutil_args', 'a b', 'c d'])
+        self.assertEqual(node.exit_code, 0)
+        self.assertEqual(node.stdout, 'a b,c d,')
+
+    def test_builtin(self):
+        ret = Exec("exit 3", LocalExecInfo())
+        self.assertEqual(ret.exit_code, 3)
+
+    def test_builtin_with_binary(self):
+        # echo is also /usr/bin/echo, which may treat -e differently
+        expected = subprocess.run(['sh', '-c', 'echo -e hi'],
+                                  capture_output=True, text=True).stdout
+        ret = Exec("echo -e hi",
+                   LocalExecInfo(collect_output=True, hide_output=True))
+        self.assertEqual(ret.stdout['localhost'], expected)
+
+    def test_reserved_word(self):
+        # time is also /usr/bin/time, which reports in another format
+        fake_bin(self, 'time', '#!/bin/sh\n')
+        for cmd in ['time true', 'if true', 'while true', 'select x']:
+            node = LocalExec.__new__(LocalExec)
+            node.cmd = cmd
+            node.cwd = os.getcwd()
+            node.env = None
+            self.assertIsNone(node._get_argv())
+
+    def test_script_no_shebang(self):
+        tmpdir, _ = self._make_script('noshebang', 'echo noshebang\n')
+        ret = Exec("./noshebang", LocalExecInfo(cwd=tmpdir,
+                                                 collect_output=True,
+                                                 hide_output=True))
+        self.assertEqual(ret.exit_code, 0)
+        self.assertEqual(ret.stdout['localhost'].strip(), 'noshebang')
+
+    def test_binary_left_path(self):
+        tmpdir, path = self._make_script('jutil_gone',
+                                         '#!/bin/sh\necho gone\n')
+        env = {'PATH': f'{tmpdir}:{os.environ["PATH"]}'}
+        ret = Exec("jutil_gone", LocalExecInfo(env=env))
+        self.assertEqual(ret.exit_code, 0)
+        os.remove(path)
+        ret = Exec("jutil_gone", LocalExecInfo(env=env, hide_output=True))
+        self.assertEqual(ret.exit_code, 127)
+
+    def test_environ_path_change(self):
+        tmpdir, _ = self._make_script('jutil_late', '#!/bin/sh\necho late\n')
+        old_path = os.environ['PATH']
+        self.addCleanup(os.environ.__setitem__, 'PATH', old_path)
+        ret = Exec("jutil_late", LocalExecInfo(hide_output=True))
+        self.assertEqual(ret.exit_code, 127)
+        # The binary is found once the inherited PATH contains it
+        os.environ['PATH'] = f'{tmpdir}:{old_path}'
+        node = LocalExec("jutil_late", LocalExecInfo(collect_output=True,
+                                                     hide_output=True))
+        self.assertIsNotNone(node._get_argv())
+        self.assertEqual(node.stdout.strip(), 'late')
+
+    def test_environ_change(self):
+        old = os.environ.get('JUTIL_TEST_VAR')
+        try:
+            os.environ['JUTIL_TEST_VAR'] = 'a'
+            Exec("printenv JUTIL_TEST_VAR", LocalExecInfo(hide_output=True))
+            os.environ['JUTIL_TEST_VAR'] = 'b'
+            for env in [None, {'JUTIL_OTHER_VAR': '1'}]:
+                ret = Exec("printenv JUTIL_TEST_VAR",
+                           LocalExecInfo(env=env, collect_output=True,
+                                         hide_output=True))
+                self.assertEqual(ret.stdout['localhost'].strip(), 'b')
+        finally:
+            if old is None:
+                os.environ.pop('JUTIL_TEST_VAR', None)
+            else:
+                os.environ['JUTIL_TEST_VAR'] = old
+
+    def test_basic_env_change(self):
+        old = os.environ.get('JAVA_HOME')
+        try:
+            os.environ['JAVA_HOME'] = '/tmp/java_a'
+            self.assertEqual(LocalExecInfo().env['JAVA_HOME'], '/tmp/java_a')
+            os.environ['JAVA_HOME'] = '/tmp/java_b'
+            self.assertEqual(LocalExecInfo().env['JAVA_HOME'], '/tmp/java_b')
+        finally:
+            if old is None:
+                os.environ.pop('JAVA_HOME', None)
+            else:
+                os.environ['JAVA_HOME'] = old
+
+    def test_sudo_prefix(self):
+        exec_info = LocalExecInfo(hide_output=True, sudoenv=False)
+        self.assertIsNone(exec_info.cmd_prefix)
+        exec_info.sudo = True
+        # Only build the command; running it would really call sudo
+        node = LocalExec.__new__(LocalExec)
+        self.assertEqual(node.prefix_cmd('true', exec_info.cmd_prefix),
+                         'sudo true')
+        self.assertIsNone(exec_info.mod(sudo=False).cmd_prefix)
+        exec_info = exec_info.mod(sudoenv=True, env={'A': '1'})
+        self.assertIn('-E A="1"', exec_info.cmd_prefix)
+
+    def test_exec_info_keys_extended(self):
+        # Subclasses may extend keys with a list, as they did before
+        # keys became a tuple
+        class MyExecInfo(LocalExecInfo):
+            def __init__(self, my_option=None, **kwargs):
+                super().__init__(**kwargs)
+                self.my_option = my_option
+                self.keys += ['my_option']
+
+        exec_info = MyExecInfo(my_option=1).mod(my_option=2)
+        self.assertEqual(exec_info.my_option, 2)
+        self.assertNotIn('my_option', LocalExecInfo.keys)
+
     def assertFile(self, path, data, strip=True):
         self.assertTrue(os.path.exists(path))
         with open(path, 'r') as fp:
@@ -0,0 +1,60 @@
+import os
+from jarvis_util.shell.slurm_exec import SlurmExec, SlurmExecInfo
+from unittest import TestCase
+from fake_bin import fake_bin
+
+
+class TestSlurmExec(TestCase):
+    def _fake_sbatch(self, script):
+        return fake_bin(self, 'sbatch', '#!/bin/sh\n' + script)
+
+    def test_job_id(self):
+        self._fake_sbatch('echo "Submitted batch job 1234"\n')
+        node = SlurmExec('hostname', SlurmExecInfo(collect_output=True,
+                                                   hide_output=True))
+        self.assertEqual(node.job_id, 1234)
+
+    def test_job_id_after_other_numbers(self):
+        self._fake_sbatch('echo "sbatch: 2 nodes requested by plugin 7"\n'
+                          'echo "Submitted batch job 1234"\n')
+        node = SlurmExec('hostname', SlurmExecInfo(collect_output=True,
+                                                   hide_output=True))
+        self.assertEqual(node.job_id, 1234)
+
+    def test_job_id_missing(self):
+        self._fake_sbatch('echo "sbatch: error: invalid partition" >&2\n'
+                          'exit 1\n')
+        node = SlurmExec('hostname', SlurmExecInfo(collect_output=True,
+                                                   hide_output=True))
+        self.assertEqual(node.exit_code, 1)
+        self.assertIsNone(node.job_id)
+
+    def test_collect_output_respected(self):
+        self._fake_sbatch('echo "Submitted batch job 1234"\n')
+        node = SlurmExec('hostname', SlurmExecInfo(collect_output=False,
+                                                   hide_output=True))
+        self.assertEqual(node.stdout, '')
+        self.assertEqual(node.job_id, 1234)
+        # Output is not collected by default
+        node = SlurmExec('hostname', SlurmExecInfo(hide_output=True))
+        self.assertEqual(node.job_id, 1234)
+
+    def test_job_log_kept(self):
+        # sbatch is given the pipe files as the job's --output/--error
+        tmpdir = self._fake_sbatch(
+            'for arg; do case "$arg" in\n'
+            '  --output=*) echo "job stdout line" > "${arg#--output=}";;\n'
+            '  --error=*) echo "job stderr line" > "${arg#--error=}";;\n'
+            'esac; done\n'
+            'echo "Submitted batch job 1234"\n')
+        out = os.path.join(tmpdir, 'out.log')
+        err = os.path.join(tmpdir, 'err.log')
+        with open(err, 'w') as fp:
+            fp.write('stale log from a previous run\n')
+        SlurmExec('hostname', SlurmExecInfo(pipe_stdout=out, pipe_stderr=err,
+                                            hide_output=True))
+        with open(out, 'r') as fp:
+            self.assertEqual(fp.read(), 'job stdout line\n'
+                                        'Submitted batch job 1234\n')
+        with open(err, 'r') as fp:
+            self.assertEqual(fp.read(), 'job stderr line\n')
@@ -0,0 +1,210 @@
+import os
+import shlex
+import socket
+import subprocess
+from jarvis_util.shell.exec import Exec
+from jarvis_util.shell.local_exec import LocalExecInfo
+from jarvis_util.shell.pssh_exec import PsshExecInfo
+from jarvis_util.shell.ssh_exec import SshExec, SshExecInfo
+from jarvis_util.shell.scp import _Scp
+from jarvis_util.shell.ssh_pool import SshConnectionPool
+from jarvis_util.jutil_manager import JutilManager
+from unittest import TestCase
+from fake_bin import fake_bin
+
+
+class TestSshExec(TestCase):
+    def setUp(self):
+        self.jutil = JutilManager.get_instance()
+        self.control_master = self.jutil.ssh_control_master
+
+    def tearDown(self):
+        self.jutil.ssh_control_master = self.control_master
+
+    def _ssh(self, addr='node-01', user=None, port=None, pkey=None,
+             ssh_env=None):
+        # Build the command strings without connecting to anything
+        node = SshExec.__new__(SshExec)
+        node.addr = addr
+        node.user = user
+        node.port = port
+        node.pkey = pkey
+        node.ssh_env = ssh_env
+        return node
+
+    def _scp(self, addr='node-01', user=None, port=None, pkey=None):
+        node = _Scp.__new__(_Scp)
+        node.addr = addr
+        node.user = user
+        node.port = port
+        node.pkey = pkey
+        node.jutil = self.jutil
+        return node
+
+    def test_ssh_opts_disabled(self):
+        self.jutil.ssh_control_master = False
+        pool = SshConnectionPool.get_instance()
+        self.assertEqual(pool.ssh_opts('node-01'), [])
+        self.assertEqual(self._ssh().ssh_cmd('hostname'),
+                         'ssh node-01 hostname')
+        self.assertEqual(self._scp().rsync_cmd('/tmp/a', '/tmp/b'),
+                         'rsync -ha /tmp/a node-01:/tmp/b')
+
+    def _fake_ssh(self):
+        # An ssh which "connects" by listening on its control socket
+        # until the socket is removed
+        tmpdir = fake_bin(self, 'ssh',
+                          '#!/bin/sh\n'
+                          'for arg; do case "$arg" in\n'
+                          '  ControlPath=*) sock="${arg#ControlPath=}";;\n'
+                          'esac; done\n'
+                          'case "$1" in\n'
+                          '  -MNf) [ -e "$FAKE_SSH_FAIL" ] && exit 255\n'
+                          '        python3 -c "$FAKE_SSH_MASTER" "$sock" &\n'
+                          '        while [ ! -S "$sock" ]; do sleep 0.01; '
+                          'done;;\n'
+                          '  -O) rm -f "$sock";;\n'
+                          'esac\n')
+        os.environ['FAKE_SSH_MASTER'] = (
+            'import os, socket, sys, time\n'
+            'sock = socket.socket(socket.AF_UNIX)\n'
+            'sock.bind(sys.argv[1])\n'
+            'sock.listen()\n'
+            'deadline = time.time() + 60\n'
+            'while os.path.exists(sys.argv[1]) and time.time() < deadline:\n'
+            '    time.sleep(0.05)\n')
+        self.addCleanup(os.environ.pop, 'FAKE_SSH_MASTER', None)
+        os.environ['FAKE_SSH_FAIL'] = os.path.join(tmpdir, 'fail')
+        self.addCleanup(os.environ.pop, 'FAKE_SSH_FAIL', None)
+        return os.environ['FAKE_SSH_FAIL']
+
+    def test_ssh_opts(self):
+        self._fake_ssh()
+        self.jutil.ssh_control_master = True
+        pool = SshConnectionPool.get_instance()
+        key = ('me', 'node-01', 2222, None)
+        opts = pool.ssh_opts('node-01', user='me', port=2222)
+        path = pool.control_path('node-01', user='me', port=2222)
+        self.assertEqual(opts, ['-o ControlMaster=no',
+                                f'-o ControlPath={path}'])
+        master = pool.masters[key]
+        master.wait()
+        self.assertTrue(os.path.exists(path))
+        # A live master is reused
+        pool.ssh_opts('node-01', user='me', port=2222)
+        self.assertIs(pool.masters[key], master)
+        pool.close('node-01', user='me', port=2222)
+        self.assertNotIn(key, pool.masters)
+        self.assertFalse(os.path.exists(path))
+
+    def test_ssh_opts_restart(self):
+        fail = self._fake_ssh()
+        self.jutil.ssh_control_master = True
+        pool = SshConnectionPool.get_instance()
+        key = (None, 'node-02', None, None)
+        # A master which failed to connect is not started again
+        # until retry_interval has passed
+        open(fail, 'w').close()
+        pool.ssh_opts('node-02')
+        master = pool.masters[key]
+        self.assertEqual(master.wait(), 255)
+        os.remove(fail)
+        pool.ssh_opts('node-02')
+        self.assertNotIn(key, pool.masters)
+        self.assertIn(key, pool.failed)
+        self.addCleanup(setattr, pool, 'retry_interval', pool.retry_interval)
+        pool.retry_interval = 0
+        pool.ssh_opts('node-02')
+        self.assertNotIn(key, pool.failed)
+        master = pool.masters[key]
+        master.wait()
+        # So is a master which exited after ControlPersist expired
+        path = pool.control_path('node-02')
+        os.remove(path)
+        pool.ssh_opts('node-02')
+        self.assertIsNot(pool.masters[key], master)
+        master = pool.masters[key]
+        master.wait()
+        # And a master which was killed, leaving a stale socket behind
+        os.remove(path)
+        stale = socket.socket(socket.AF_UNIX)
+        stale.bind(path)
+        stale.close()
+        pool.ssh_opts('node-02')
+        self.assertIsNot(pool.masters[key], master)
+        pool.masters[key].wait()
+        self.assertTrue(pool.is_alive(key))
+        pool.close_all()
+
+    def test_ssh_cmd(self):
+        self._fake_ssh()
+        self.jutil.ssh_control_master = True
+        pool = SshConnectionPool.get_instance()
+        node = self._ssh(user='me', port=2222, pkey='/tmp/key',
+                         ssh_env={'A': '1'})
+        self.assertEqual(
+            node.ssh_cmd('hostname'),
+            'ssh -o ControlMaster=no -o ControlPath='
+            f'{pool.control_path("node-01", "me", 2222, "/tmp/key")} '
+            '-i /tmp/key -p 2222 me@node-01 A="1" hostname')
+        pool.close_all()
+
+    def test_rsync_cmd(self):
+        self._fake_ssh()
+        self.jutil.ssh_control_master = True
+        pool = SshConnectionPool.get_instance()
+        node = self._scp(user='me', port=2222)
+        argv = shlex.split(node.rsync_cmd('/tmp/a', '/tmp/b'))
+        self.assertEqual(argv, [
+            'rsync', '-ha', '-e',
+            'ssh -o ControlMaster=no -o ControlPath='
+            f'{pool.control_path("node-01", "me", 2222)} -p 2222',
+            '/tmp/a', 'me@node-01:/tmp/b'])
+        pool.close_all()
+
+    def _remote_argv(self, node, cmd):
+        # What the remote shell receives: ssh joins the words
+        # after the destination with spaces
+        argv = shlex.split(node.ssh_cmd(cmd))
+        remote = ' '.join(argv[argv.index(node.addr) + 1:])
+        return remote, shlex.split(remote)
+
+    def test_batch_cmd(self):
+        self.jutil.ssh_control_master = False
+        cmds = ['echo "a b"', "echo $A 'c'"]
+        node = self._ssh(ssh_env={'A': '1'})
+        remote, argv = self._remote_argv(node, node.batch_cmd(cmds))
+        self.assertEqual(argv[:-3], ['A=1'])
+        self.assertEqual(argv[-3:], ['bash', '-c', '\n'.join(cmds)])
+        out = subprocess.run(['bash', '-c', remote], capture_output=True,
+                             text=True, check=True).stdout
+        self.assertEqual(out, 'a b\n1 c\n')
+
+    def test_batch_cmd_sudo(self):
+        self.jutil.ssh_control_master = False
+        cmds = ['echo "a b"', "echo 'c'"]
+        node = self._ssh(ssh_env={'A': '1'})
+        prefix = SshExecInfo(sudo=True, sudoenv=False).cmd_prefix
+        cmd = node.prefix_cmd(node.batch_cmd(cmds), prefix)
+        _, argv = self._remote_argv(node, cmd)
+        self.assertEqual(argv, ['A=1', 'sudo', 'bash', '-c', '\n'.join(cmds)])
+
+    def test_sudo_ld_preload(self):
+        # sudo clears LD_PRELOAD, so it must be forwarded with -E
+        fake_bin(self, 'ssh', '#!/bin/sh\n')
+        self.jutil.ssh_control_master = False
+        node = SshExec('true', SshExecInfo(
+            hosts='127.0.0.1', sudo=True, hide_output=True,
+            env={'LD_PRELOAD': '/tmp/libjutil.so'}))
+        self.assertIn('sudo ', node.cmd)
+        self.assertIn('-E LD_PRELOAD="/tmp/libjutil.so"', node.cmd)
+
+    def test_pssh_dict_cmd(self):
+        ret = Exec({'localhost': ['echo a', 'echo b']},
+                   PsshExecInfo(collect_output=True, hide_output=True))
+        self.assertEqual(ret.exit_code, 0)
+        self.assertEqual(ret.stdout['localhost'], 'a\nb\n')
+
+    def test_dict_cmd_rejected(self):
+        with self.assertRaises(Exception):
+            Exec({'localhost': 'echo a'}, LocalExecInfo())